@@ -1,19 +1,57 @@
-from collections import OrderedDict
+from functools import lru_cache, total_ordering
+from itertools import combinations_with_replacement
+from operator import attrgetter
 
 __all__ = ('Hand', 'Card', 'CombinationError')
 
+# Ranks mask of T, J, Q, K, A
+_ROYAL_RANKS = 0b1111100000000
 
-class Card(object):
+# Ranks mask of A, 2, 3, 4, 5: ace plays low there
+_WHEEL_RANKS = 0b1000000001111
+
+_STRAIGHTS = frozenset([0b11111 << shift for shift in range(9)] + [_WHEEL_RANKS])
+
+# Hand rank keeps combination priority above the priorities inside of combination, 4 bits for each of 5 cards
+_TIEBREAK_BITS = 20
+
+
+class Card:
 
     RANKS = ('2', '3', '4', '5', '6', '7', '8', '9', 'T', 'J', 'Q', 'K', 'A')
     RANK_REPR = {'T': '10', 'J': 'Jack', 'Q': 'Queen', 'K': 'King', 'A': 'Ace'}
     SUITS = {'C': 'Clubs', 'D': 'Diamonds', 'H': 'Hearts', 'S': 'Spades'}
 
-    def __init__(self, card):
+    __slots__ = ('_rank', '_suit', '_priority', '_str', '_id', '_rank_bit', '_suit_bit')
+
+    def __new__(cls, card):
+        """ All 52 cards are created once by the pool, a card entity only picks one of them """
+        try:
+            return _CARD_POOL[card]
+        except (KeyError, TypeError):
+            pass
+
         assert isinstance(card, str) and len(card) == 2, "Wrong card entity: '{}'".format(card)
-        self._rank, self._suit = card.upper()
-        assert self._rank in self.RANKS, "Wrong Rank of: {}".format(card)
-        assert self._suit in self.SUITS.keys(), "Wrong Suit of: {}".format(card)
+        rank, suit = card.upper()
+        assert rank in cls.RANKS, "Wrong Rank of: {}".format(card)
+        assert suit in cls.SUITS.keys(), "Wrong Suit of: {}".format(card)
+        return _CARD_POOL[rank + suit]
+
+    @classmethod
+    def _make(cls, rank, suit):
+        """ Create a card for the pool
+        :type rank: str
+        :type suit: str
+        :rtype: Card
+        """
+        self = super().__new__(cls)
+        self._rank, self._suit = rank, suit
+        self._priority = _RANK_PRIORITY[rank]
+        self._str = rank + suit
+        self._id = 4 * self._priority + 'CDHS'.index(suit)
+        self._rank_bit = 1 << self._priority
+        self._suit_bit = _SUIT_BIT[suit]
+        return self
 
     @property
     def rank(self):
@@ -25,29 +63,56 @@ class Card(object):
 
     @property
     def priority(self):
-        return self.RANKS.index(self._rank)
+        return self._priority
+
+    @property
+    def id(self):
+        """ Card id from 0 to 51: 4 * priority + index of suit in 'CDHS'
+        :rtype: int
+        """
+        return self._id
 
     def __eq__(self, card):
-        return self.rank == card.rank and self.suit == card.suit
+        return self is card
 
     def __hash__(self):
-        return hash(self._rank + self._suit)
+        return self._id
+
+    def __reduce__(self):
+        # Keep unpickled and copied cards in the pool
+        return Card, (self._str,)
 
     def __str__(self):
-        return self._rank + self._suit
+        return self._str
 
 
-class _Cards(object):
+_RANK_PRIORITY = {rank: priority for priority, rank in enumerate(Card.RANKS)}
+_SUIT_BIT = {'C': 1, 'D': 2, 'H': 4, 'S': 8}
+_CARD_POOL = {rank + suit: Card._make(rank, suit) for rank in Card.RANKS for suit in Card.SUITS}
+
+
+class _Cards:
     """
     Context class with prepared data for comparison of combinations
     """
 
+    __slots__ = ('_sorted_cards', '_sorted_ranks', '_similar_ranks', '_rank_or', '_suit_or')
+
     def __init__(self, cards):
-        self._sorted_cards = sorted(cards, key=lambda _card: _card.priority)
-        self._sorted_ranks = [card.rank for card in self._sorted_cards]
-        self._similar_ranks = OrderedDict(
-            [(card.priority, self.sorted_ranks.count(card.rank)) for card in self._sorted_cards]
-        )
+        self._sorted_cards = sorted_cards = sorted(cards, key=attrgetter('_priority'))
+        sorted_ranks = []
+        similar_ranks = {}
+        rank_or = suit_or = 0
+        for card in sorted_cards:
+            sorted_ranks.append(card._rank)
+            similar_ranks[card._priority] = similar_ranks.get(card._priority, 0) + 1
+            rank_or |= card._rank_bit
+            suit_or |= card._suit_bit
+
+        self._sorted_ranks = sorted_ranks
+        self._similar_ranks = similar_ranks
+        self._rank_or = rank_or
+        self._suit_or = suit_or
 
     @property
     def sorted_cards(self):
@@ -70,17 +135,67 @@ class _Cards(object):
         """
         return self._similar_ranks
 
+    @property
+    def rank_mask(self):
+        """ Bit mask of presented ranks, bit per rank from 2 to A
+        :rtype: int
+        """
+        return self._rank_or
+
+    @property
+    def is_flush(self):
+        """ All cards have the same suit, so only one bit is set in suits mask
+        :rtype: bool
+        """
+        return not self._suit_or & (self._suit_or - 1)
+
+    @property
+    def is_straight(self):
+        """ Ranks mask is one of five ranks in a row, including the wheel
+        :rtype: bool
+        """
+        return self._rank_or in _STRAIGHTS
+
+    @property
+    def shape(self):
+        """ Qty of duplicates for every rank from max to min, e.g. (3, 1, 1) for three of a kind
+        :rtype: tuple[int]
+        """
+        return tuple(sorted(self._similar_ranks.values(), reverse=True))
+
     def __str__(self):
         return ', '.join(map(str, self._sorted_cards))
 
 
-class _Combination(object):
+def _table_key(cards):
+    """ Key of combinations table, the same for cards with equal combination and priorities.
+    Whole evaluation of a hand is this single pass over bitboards: every rank owns a bit in ranks mask
+    and a four-bit counter in histogram, every suit owns a bit in suits mask
+    :type cards: list[Card]
+    :rtype: int
+    """
+    rank_or = suit_or = histogram = 0
+    for card in cards:
+        rank_or |= card._rank_bit
+        suit_or |= card._suit_bit
+        # (1 << rank) ** 4 == 1 << 4 * rank, i.e. the lowest bit of the rank counter
+        histogram += card._rank_bit ** 4
+
+    is_flush = not suit_or & (suit_or - 1)
+    return histogram << 2 | is_flush << 1 | (rank_or in _STRAIGHTS)
+
+
+@total_ordering
+class _Combination:
+
+    __slots__ = ('_cards', '_sort_key')
 
     _name = None
 
     def __init__(self, cards):
         assert self._name, "Combination must have a name"
         self._cards = cards
+        self._sort_key = None
 
     @property
     def priority_list(self):
@@ -89,22 +204,40 @@ class _Combination(object):
         """
         return []
 
-    def _match_suit(self):
+    @classmethod
+    def _match_suit(cls, cards):
         return True
 
-    def _match_ranks(self):
+    @classmethod
+    def _match_ranks(cls, cards):
         return True
 
-    def match(self):
-        return self._match_suit() and self._match_ranks()
+    @classmethod
+    def match(cls, cards):
+        """ Check that cards make the combination, doesn't require an instance
+        :type cards: _Cards
+        :rtype: bool
+        """
+        return cls._match_suit(cards) and cls._match_ranks(cards)
+
+    def _key(self):
+        """ Priorities for comparison, higher ranks go first (priority list is reversed),
+        computed once, a combination doesn't change
+        :rtype: tuple[int]
+        """
+        if self._sort_key is None:
+            self._sort_key = tuple(reversed(self.priority_list))
+        return self._sort_key
+
+    def __eq__(self, other):
+        return self.__class__ == other.__class__ and self._key() == other._key()
 
-    def __cmp__(self, other):
+    def __lt__(self, other):
         assert self.__class__ == other.__class__, "You can only compare the same combinations"
-        # We have to compare higher ranks first in priority list (must be reversed)
-        self_priority, other_priority = self.priority_list, other.priority_list
-        self_priority.reverse()
-        other_priority.reverse()
-        return cmp(self_priority, other_priority)
+        return self._key() < other._key()
+
+    def __hash__(self):
+        return hash((self.__class__, self._key()))
 
     def __str__(self):
         return self._name
@@ -112,40 +245,52 @@ class _Combination(object):
 
 class _Straight(_Combination):
 
+    __slots__ = ()
+
     _name = 'Straight'
 
-    def _match_ranks(self):
-        # Check that priority is a sequence with step by 1
-        sequence = [card.priority for card in self._cards.sorted_cards]
-        return all([second - first == 1 for first, second in zip(sequence, sequence[1:])])
+    @classmethod
+    def _match_ranks(cls, cards):
+        return cards.is_straight
 
     @property
     def priority_list(self):
-        return [self._cards.sorted_cards[-1].priority]
+        if self._cards.rank_mask == _WHEEL_RANKS:
+            return [_RANK_PRIORITY['5']]
+        return [self._cards.rank_mask.bit_length() - 1]
 
 
 class _StraightFlush(_Straight):
 
+    __slots__ = ()
+
     _name = 'Straight Flush'
 
-    def _match_suit(self):
-        return len(set([card.suit for card in self._cards.sorted_cards])) == 1
+    @classmethod
+    def _match_suit(cls, cards):
+        return cards.is_flush
 
 
 class _RoyalFlush(_StraightFlush):
 
+    __slots__ = ()
+
     _name = 'Royal Flush'
 
-    def _match_ranks(self):
-        return self._cards.sorted_ranks == ['T', 'J', 'Q', 'K', 'A']
+    @classmethod
+    def _match_ranks(cls, cards):
+        return cards.rank_mask == _ROYAL_RANKS
 
 
 class _FourOfAKind(_Combination):
 
+    __slots__ = ()
+
     _name = 'Four of a Kind'
 
-    def _match_ranks(self):
-        return self._cards.similar_ranks.values().count(4) == 1
+    @classmethod
+    def _match_ranks(cls, cards):
+        return cards.shape == (4, 1)
 
     @property
     def priority_list(self):
@@ -154,10 +299,13 @@ class _FourOfAKind(_Combination):
 
 class _FullHouse(_Combination):
 
+    __slots__ = ()
+
     _name = 'Full House'
 
-    def _match_ranks(self):
-        return len(set([card.rank for card in self._cards.sorted_cards])) == 2
+    @classmethod
+    def _match_ranks(cls, cards):
+        return cards.shape == (3, 2)
 
     @property
     def priority_list(self):
@@ -166,10 +314,13 @@ class _FullHouse(_Combination):
 
 class _Flush(_Combination):
 
+    __slots__ = ()
+
     _name = 'Flush'
 
-    def _match_suit(self):
-        return len(set([card.suit for card in self._cards.sorted_cards])) == 1
+    @classmethod
+    def _match_suit(cls, cards):
+        return cards.is_flush
 
     @property
     def priority_list(self):
@@ -178,10 +329,13 @@ class _Flush(_Combination):
 
 class _TreeOfAKind(_Combination):
 
+    __slots__ = ()
+
     _name = 'Tree Of a Kind'
 
-    def _match_ranks(self):
-        return self._cards.similar_ranks.values().count(3) == 1
+    @classmethod
+    def _match_ranks(cls, cards):
+        return cards.shape == (3, 1, 1)
 
     @property
     def priority_list(self):
@@ -190,10 +344,13 @@ class _TreeOfAKind(_Combination):
 
 class _TwoPair(_Combination):
 
+    __slots__ = ()
+
     _name = 'Two Pair'
 
-    def _match_ranks(self):
-        return self._cards.similar_ranks.values().count(2) == 2
+    @classmethod
+    def _match_ranks(cls, cards):
+        return cards.shape == (2, 2, 1)
 
     @property
     def priority_list(self):
@@ -202,10 +359,13 @@ class _TwoPair(_Combination):
 
 class _OnePair(_Combination):
 
+    __slots__ = ()
+
     _name = 'One Pair'
 
-    def _match_ranks(self):
-        return self._cards.similar_ranks.values().count(2) == 1
+    @classmethod
+    def _match_ranks(cls, cards):
+        return cards.shape == (2, 1, 1, 1)
 
     @property
     def priority_list(self):
@@ -214,6 +374,8 @@ class _OnePair(_Combination):
 
 class _HighCard(_Combination):
 
+    __slots__ = ()
+
     _name = 'High Card'
 
     @property
@@ -225,7 +387,7 @@ class CombinationError(Exception):
     pass
 
 
-class Hand(object):
+class Hand:
 
     CARDS_QTY = 5
 
@@ -241,11 +403,22 @@ class Hand(object):
                     _RoyalFlush)
 
     def __init__(self, card_list):
-        assert filter(lambda card: isinstance(card, Card), card_list), "Wrong type of object, only Card is supported"
-        assert len(card_list) == self.CARDS_QTY, "Cards can\'t be more or less than {}".format(self.CARDS_QTY)
-        assert len(set(card_list)) == self.CARDS_QTY, "Cards can\'t be the equal: {}".format(map(str, card_list))
-        self._cards = _Cards(card_list)
-        self._combination = self.match_combination(self._cards)
+        if __debug__:
+            self._validate(card_list)
+        self._cards = tuple(card_list)
+        self._rank, self._combination_cls = _COMBINATIONS_TABLE[_table_key(card_list)]
+        self._combination = None
+
+    @classmethod
+    def _validate(cls, card_list):
+        """ Check list of cards for a hand, skipped entirely with `python -O`
+        :type card_list: list[Card]
+        """
+        assert all(isinstance(card, Card) for card in card_list), "Wrong type of object, only Card is supported"
+        assert len(card_list) == cls.CARDS_QTY, "Cards can\'t be more or less than {}".format(cls.CARDS_QTY)
+        assert len(set(card_list)) == cls.CARDS_QTY, "Cards can\'t be the equal: {}".format(
+            [str(card) for card in card_list]
+        )
 
     @classmethod
     def from_string(cls, cards):
@@ -256,6 +429,44 @@ class Hand(object):
         assert isinstance(cards, str), "cards must be a string"
         return cls([Card(card) for card in cards.split()])
 
+    @classmethod
+    def rank_many(cls, ids):
+        """ Ranks of many hands at once, the same as `Hand.rank` of every hand, numpy is required
+        :param ids: N x 5 array of card ids, see `Card.id`
+        :type ids: numpy.ndarray
+        :rtype: numpy.ndarray
+        """
+        import numpy as np
+
+        ids = np.asarray(ids)
+        if ids.ndim != 2 or ids.shape[1] != cls.CARDS_QTY:
+            raise ValueError("Ids must be of N x {} shape".format(cls.CARDS_QTY))
+        if ids.size and not np.issubdtype(ids.dtype, np.integer):
+            raise ValueError("Ids must be integers")
+        if ((ids < 0) | (ids >= len(_CARD_POOL))).any():
+            raise ValueError("Ids must be from 0 to {}".format(len(_CARD_POOL) - 1))
+        sorted_ids = np.sort(ids, axis=1)
+        if (sorted_ids[:, 1:] == sorted_ids[:, :-1]).any():
+            raise ValueError("Cards can\'t be the equal")
+
+        ids = ids.astype(np.uint64)
+        table_keys, table_ranks, straights = _rank_arrays()
+        one = np.uint64(1)
+        ranks, suits = ids >> np.uint64(2), ids & np.uint64(3)
+        rank_or = np.bitwise_or.reduce(one << ranks, axis=1)
+        suit_or = np.bitwise_or.reduce(one << suits, axis=1)
+        histogram = (one << (ranks << np.uint64(2))).sum(axis=1, dtype=np.uint64)
+        is_flush = (suit_or & (suit_or - one)) == 0
+        is_straight = np.isin(rank_or, straights)
+        keys = histogram << np.uint64(2) | is_flush.astype(np.uint64) << one | is_straight.astype(np.uint64)
+
+        index = np.searchsorted(table_keys, keys)
+        found = index < len(table_keys)
+        found[found] = table_keys[index[found]] == keys[found]
+        if not found.all():
+            raise CombinationError("Combination wasn't found")
+        return table_ranks[index]
+
     @classmethod
     def match_combination(cls, cards):
         """ Get combination for current list of cards
@@ -263,17 +474,18 @@ class Hand(object):
         :rtype: _Combination
         """
         for comb_cls in reversed(cls.COMBINATIONS):
-            combination = comb_cls(cards)
-            if combination.match():
-                return combination
+            if comb_cls.match(cards):
+                return comb_cls(cards)
 
         raise CombinationError("Combination wasn't found")
 
     @property
     def combination(self):
-        """ Current combination for a hand
+        """ Current combination for a hand, built from the hand cards on first access
         :rtype: _Combination
         """
+        if self._combination is None:
+            self._combination = self._combination_cls(_Cards(self._cards))
         return self._combination
 
     @property
@@ -281,23 +493,96 @@ class Hand(object):
         """ Current priority of combination
         :rtype: int
         """
-        return self.COMBINATIONS.index(self.combination.__class__)
+        return self._rank >> _TIEBREAK_BITS
+
+    @property
+    def rank(self):
+        """ Rank of a hand, higher rank beats lower one: combination priority and priorities inside of it
+        :rtype: int
+        """
+        return self._rank
+
+    def __eq__(self, other):
+        if not isinstance(other, self.__class__):
+            return NotImplemented
+        return self._rank == other._rank
+
+    # Every ordering is a single comparison of precomputed ranks, no total_ordering wrappers
+    def __lt__(self, other):
+        if not isinstance(other, self.__class__):
+            return NotImplemented
+        return self._rank < other._rank
 
-    def __cmp__(self, other):
-        assert isinstance(other, self.__class__), "Wrong comparison objects"
+    def __le__(self, other):
+        if not isinstance(other, self.__class__):
+            return NotImplemented
+        return self._rank <= other._rank
 
-        if self.priority == other.priority:
-            return cmp(self.combination, other.combination)
+    def __gt__(self, other):
+        if not isinstance(other, self.__class__):
+            return NotImplemented
+        return self._rank > other._rank
 
-        return cmp(self.priority, other.priority)
+    def __ge__(self, other):
+        if not isinstance(other, self.__class__):
+            return NotImplemented
+        return self._rank >= other._rank
+
+    def __hash__(self):
+        return self._rank
 
     def __str__(self):
         return "<hand [{cards}], '{combination}'>".format(
-            cards=self._cards,
-            combination=self._combination
+            cards=', '.join(map(str, sorted(self._cards, key=attrgetter('_priority')))),
+            combination=self.combination
         )
 
 
+def _build_combinations_table():
+    """ Match combination once for every possible set of ranks, flush and not flush,
+    hands are resolved by the key of their cards then to the hand rank and combination class
+    :rtype: dict[int, (int, type)]
+    """
+    table = {}
+    for ranks in combinations_with_replacement(Card.RANKS, Hand.CARDS_QTY):
+        # Suit is picked by occurrence of the rank, so equal ranks never share a suit
+        suits = [ranks[:i].count(rank) for i, rank in enumerate(ranks)]
+        if max(suits) == len(Card.SUITS):
+            continue
+        variants = [suits]
+        if not any(suits):
+            variants.append(suits[:-1] + [1])
+
+        for variant in variants:
+            cards = [Card(rank + 'CDHS'[suit]) for rank, suit in zip(ranks, variant)]
+            combination = Hand.match_combination(_Cards(cards))
+            tiebreak = 0
+            for priority in combination._key():
+                tiebreak = tiebreak << 4 | priority
+            rank = Hand.COMBINATIONS.index(combination.__class__) << _TIEBREAK_BITS | tiebreak
+            table[_table_key(cards)] = (rank, combination.__class__)
+
+    return table
+
+
+_COMBINATIONS_TABLE = _build_combinations_table()
+
+
+@lru_cache(maxsize=None)
+def _rank_arrays():
+    """ Combinations table as sorted numpy arrays of keys and hand ranks, with ranks masks of straights,
+    for `Hand.rank_many`
+    :rtype: (numpy.ndarray, numpy.ndarray, numpy.ndarray)
+    """
+    import numpy as np
+
+    keys = sorted(_COMBINATIONS_TABLE)
+    ranks = [_COMBINATIONS_TABLE[key][0] for key in keys]
+    straights = sorted(_STRAIGHTS)
+    return (np.array(keys, dtype=np.uint64), np.array(ranks, dtype=np.int32),
+            np.array(straights, dtype=np.uint64))
+
+
 if __name__ == '__main__':
     for hand in sorted([
         Hand.from_string('6D 3D 5d 4d 2D'),
@@ -316,4 +601,4 @@ if __name__ == '__main__':
         Hand.from_string('KD KS QS KC KH'),
         Hand.from_string('QD QS QH QC KH')
     ], reverse=True):
-        print hand
+        print(hand)